@@ -1,21 +1,89 @@
 import streamlit as st
 import sqlite3
 import os
-import shutil
-from PIL import Image
+import re
+import io
+import base64
+import secrets
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote
+from PIL import Image, ImageOps
 import pandas as pd
+import xlsxwriter
+try:
+    from sqlalchemy import text # st.connection (type='sql') ใช้ SQLAlchemy 2.x ซึ่งรับ SQL ที่เป็นสตริงผ่าน text() เท่านั้น
+except ImportError:
+    text = None # รันแบบ local ด้วย sqlite3 โดยตรงไม่จำเป็นต้องมี SQLAlchemy
 
 # --- Configuration ---
-DATABASE_NAME = 'teacher_management.db'
-PHOTO_DIR = 'teacher_photos'
+# ไฟล์ข้อมูลทั้งหมดอยู่ข้างไฟล์สคริปต์ ไม่ขึ้นกับ working directory ตอนสั่ง streamlit run
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_NAME = os.path.join(APP_DIR, 'teacher_management.db')
+PHOTO_DIR = os.path.join(APP_DIR, 'teacher_photos')
 UPLOAD_FOLDER = PHOTO_DIR 
+# ภาพย่อที่สร้างไว้ตอนอัปโหลด (ชื่อเดียวกับรูปต้นฉบับ + .webp) อยู่ในโฟลเดอร์ static ของ Streamlit
+# เพื่อให้เบราว์เซอร์โหลดตรงผ่าน HTTP และใช้ cache ของเบราว์เซอร์ได้ (ต้องเปิด server.enableStaticServing)
+# Streamlit เสิร์ฟ /app/static จากโฟลเดอร์ static ข้างไฟล์สคริปต์ ไม่ใช่จาก working directory
+THUMBNAIL_FOLDER = os.path.join(APP_DIR, 'static', 'thumbs')
+THUMBNAIL_URL_PREFIX = 'app/static/thumbs/'
+ALLOWED_PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg') # นามสกุลรูปที่รับ (ตรงกับ type= ของ st.file_uploader)
+MAX_PHOTO_BYTES = 10 * 1024 * 1024 # ขนาดไฟล์รูปสูงสุดที่รับ (10 MiB)
+ORPHAN_PHOTO_GRACE_SECONDS = 3600 # ไฟล์รูปที่ไม่มีครูอ้างถึงจะถูกลบตอนเริ่มโปรเซส เมื่อเก่ากว่านี้
+GENERATED_PHOTO_NAME = re.compile(r'[0-9a-f]{32}\.jpg') # ชื่อไฟล์รูปที่แอปตั้งเอง (secrets.token_hex(16) + .jpg)
+THUMBNAIL_SIZE = (150, 150) # ขนาดสูงสุดของภาพย่อในหน้ารายการ
+PHOTO_MAX_SIZE = (1024, 1024) # ขนาดสูงสุดของรูปที่เก็บ (ย่อและบีบอัดเป็น JPEG ตอนอัปโหลด)
+PHOTO_JPEG_QUALITY = 85
+DB_POOL_SIZE = 8 # จำนวนการเชื่อมต่อ sqlite3 สูงสุดที่เก็บไว้ใช้ซ้ำ
+MIN_SQLITE_VERSION = (3, 35, 0) # INSERT/UPDATE/DELETE ... RETURNING ต้องใช้ SQLite 3.35 ขึ้นไป
+TEACHERS_PAGE_SIZE = 20 # จำนวนครูต่อหน้าในหน้ารายการ
+TEACHER_CACHE_MAX_ENTRIES = 64 # จำนวนครูสูงสุดที่เก็บภาพย่อ/ข้อมูลไว้ใน st.cache_data ต่อฟังก์ชัน (ราว 3 หน้าของรายการ)
+SUBJECTS_PREVIEW_CHARS = 80 # ความยาวสูงสุดของ 'สอนรายวิชา' ที่แสดงในหน้ารายการ
+IMPORT_CSV_COLUMNS = ('full_name', 'position', 'school_affiliation', 'major_subject', 'teaching_subjects', 'contact_number') # คอลัมน์ที่อ่านจากไฟล์ CSV
+IMPORT_CHUNK_ROWS = 10000 # จำนวนแถวต่อการเรียก executemany ตอนนำเข้า CSV
+# ค่าเริ่มต้นของ Session (หน้าที่แสดงและครูที่แก้ไขอยู่ใน URL)
+SESSION_DEFAULTS = {
+    'photo_cleared': False,
+    'search_query_school': "",
+}
+
+# PRAGMA ที่ตั้งค่าครั้งเดียวตอนเปิดการเชื่อมต่อ: WAL ให้ผู้อ่านไม่ถูกบล็อกระหว่างเขียน และลดการ fsync ต่อ commit
+SQLITE_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-20000;
+"""
 
 # --- Database Setup and Functions ---
 
+@st.cache_resource
+def _get_connection_pool():
+    """
+    คลังการเชื่อมต่อ sqlite3 ที่ใช้ร่วมกันทั้งโปรเซส.
+    ใช้ st.cache_resource เพราะตัวแปรระดับโมดูลของสคริปต์หลักจะถูกสร้างใหม่ทุกครั้งที่รีรัน.
+    """
+    return queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+def _open_sqlite_connection():
+    """
+    เปิดการเชื่อมต่อ sqlite3 ใหม่สำหรับใส่ลงในคลังการเชื่อมต่อ.
+    """
+    # check_same_thread=False เพราะแต่ละ session ของ Streamlit รันในเธรดของตัวเอง
+    conn = sqlite3.connect(DATABASE_NAME, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row # ทำให้สามารถเข้าถึงคอลัมน์ด้วยชื่อได้
+    conn.executescript(SQLITE_PRAGMAS) # ตั้งค่าครั้งเดียวต่อการเชื่อมต่อ ไม่ใช่ทุกครั้งที่ยืม
+    return conn
+
 def get_db_connection():
     """
     สร้างและส่งคืนการเชื่อมต่อฐานข้อมูล SQLite.
-    พยายามใช้ st.connection ถ้ามี, ไม่เช่นนั้นจะ fallback ไปใช้ sqlite3 โดยตรง.
+    พยายามใช้ st.connection ถ้ามี, ไม่เช่นนั้นจะยืมการเชื่อมต่อ sqlite3 จากคลังการเชื่อมต่อ.
     """
     try:
         if "connections" in st.secrets and "teacher_db" in st.secrets["connections"]:
@@ -24,9 +92,51 @@ def get_db_connection():
         pass # หากไม่มี st.secrets หรือเกิดข้อผิดพลาด ให้ลองใช้ sqlite3 โดยตรง
     
     # Fallback สำหรับการรันแบบ local หรือกรณีไม่มี st.connection
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row # ทำให้สามารถเข้าถึงคอลัมน์ด้วยชื่อได้
-    return conn
+    try:
+        return _get_connection_pool().get_nowait()
+    except queue.Empty:
+        return _open_sqlite_connection()
+
+def release_db_connection(conn):
+    """
+    คืนการเชื่อมต่อ sqlite3 กลับเข้าคลัง หรือปิดทิ้งหากคลังเต็มแล้ว.
+    """
+    if hasattr(conn, 'session'):
+        return # st.connection จัดการการเชื่อมต่อของตัวเองอยู่แล้ว
+    if conn.in_transaction:
+        conn.rollback() # ไม่คืนการเชื่อมต่อที่ค้าง transaction ไว้ให้ผู้ยืมคนถัดไป
+    try:
+        _get_connection_pool().put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+@contextmanager
+def borrow_conn():
+    """
+    ยืมการเชื่อมต่อฐานข้อมูลสำหรับใช้ภายในบล็อก with แล้วคืนให้อัตโนมัติเมื่อจบบล็อก.
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        release_db_connection(conn)
+
+# โครงสร้างตารางและดัชนี ใช้ร่วมกันทั้ง st.connection และ sqlite3
+CREATE_TEACHERS_TABLE = """
+    CREATE TABLE IF NOT EXISTS teachers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        school_affiliation TEXT,
+        major_subject TEXT,
+        teaching_subjects TEXT,
+        contact_number TEXT,
+        photo_path TEXT,
+        position TEXT
+    )
+"""
+ADD_POSITION_COLUMN = "ALTER TABLE teachers ADD COLUMN position TEXT"
+# ดัชนีสำหรับเรียง/ค้นหาตามชื่อ เมื่อรายการครูมีจำนวนมากขึ้น (สร้างหลัง migration เสมอ)
+CREATE_TEACHERS_INDEXES = "CREATE INDEX IF NOT EXISTS idx_teachers_full_name ON teachers(full_name)"
 
 def setup_database():
     """
@@ -34,364 +144,983 @@ def setup_database():
     และสร้างโฟลเดอร์สำหรับเก็บรูปภาพ
     รวมถึงเพิ่มคอลัมน์ 'position' หากยังไม่มี (เพื่อรองรับการอัปเดตโครงสร้าง)
     """
-    conn = get_db_connection()
-    
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection (เช่นบน Streamlit Community Cloud)
-        with conn.session as s:
-            s.execute('''
-                CREATE TABLE IF NOT EXISTS teachers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    full_name TEXT NOT NULL,
-                    school_affiliation TEXT,
-                    major_subject TEXT,
-                    teaching_subjects TEXT,
-                    contact_number TEXT,
-                    photo_path TEXT,
-                    position TEXT  
-                )
-            ''')
-            s.commit()
-            
-            # ตรวจสอบและเพิ่มคอลัมน์ 'position' หากยังไม่มี (เพื่อรองรับฐานข้อมูลเก่า)
-            cursor = s.connection.cursor() # เข้าถึง sqlite3 cursor จาก st.connection
-            cursor.execute("PRAGMA table_info(teachers)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if 'position' not in columns:
-                s.execute("ALTER TABLE teachers ADD COLUMN position TEXT")
-                s.commit()
-    else:
-        # สำหรับ sqlite3 โดยตรง (เช่นการรันแบบ local)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS teachers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                school_affiliation TEXT,
-                major_subject TEXT,
-                teaching_subjects TEXT,
-                contact_number TEXT,
-                photo_path TEXT,
-                position TEXT  
-            )
-        ''')
-        conn.commit()
-        
-        # ตรวจสอบและเพิ่มคอลัมน์ 'position' หากยังไม่มี
-        cursor.execute("PRAGMA table_info(teachers)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'position' not in columns:
-            cursor.execute("ALTER TABLE teachers ADD COLUMN position TEXT")
-            conn.commit()
-        conn.close() # ปิดการเชื่อมต่อเมื่อเสร็จสิ้นการตั้งค่า
+    # ตรวจตั้งแต่เริ่ม แทนที่จะไปล้มด้วย syntax error ตอนเพิ่ม/แก้ไข/ลบครั้งแรก
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(
+            f"แอปนี้ต้องใช้ SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} ขึ้นไป (คำสั่ง RETURNING) "
+            f"แต่ Python ที่ใช้อยู่มาพร้อม SQLite {sqlite3.sqlite_version}"
+        )
+
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection (เช่นบน Streamlit Community Cloud)
+            with conn.session as s:
+                s.execute(text(CREATE_TEACHERS_TABLE))
+
+                # ตรวจสอบและเพิ่มคอลัมน์ 'position' หากยังไม่มี (เพื่อรองรับฐานข้อมูลเก่า)
+                columns = [col[1] for col in s.execute(text("PRAGMA table_info(teachers)"))]
+                if 'position' not in columns:
+                    s.execute(text(ADD_POSITION_COLUMN))
+
+                s.execute(text(CREATE_TEACHERS_INDEXES))
+                s.commit() # commit ครั้งเดียวหลังสร้างโครงสร้างครบ
+        else:
+            # สำหรับ sqlite3 โดยตรง (เช่นการรันแบบ local)
+            # ตรวจคอลัมน์ก่อน (ตารางที่ยังไม่มีจะได้ผลว่าง และ CREATE TABLE มี 'position' อยู่แล้ว)
+            # แล้วส่งทุกคำสั่งใน executescript เดียวภายใน transaction เดียว
+            columns = [col[1] for col in conn.execute("PRAGMA table_info(teachers)")]
+            migration = f"{ADD_POSITION_COLUMN};" if columns and 'position' not in columns else ""
+            conn.executescript(f"""
+                BEGIN;
+                {CREATE_TEACHERS_TABLE};
+                {migration}
+                {CREATE_TEACHERS_INDEXES};
+                COMMIT;
+            """)
 
     # สร้างโฟลเดอร์สำหรับเก็บรูปภาพ หากยังไม่มี
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
+    _reconcile_photo_files()
+
+def _recent_or_temp(entry, now):
+    """
+    ไฟล์ที่ไม่ควรถือเป็นไฟล์ค้าง: ไฟล์ชั่วคราวที่กำลังเขียน หรือไฟล์ที่เพิ่งเขียนไม่นาน
+    (รูปถูกเขียนก่อนบันทึกแถวลงฐานข้อมูล จึงอาจยังไม่มีแถวอ้างถึง).
+    ไฟล์ที่ stat ไม่ได้ (เช่นถูกลบไปแล้วหลัง scandir) ก็ไม่ถือเป็นไฟล์ค้าง.
+    """
+    if entry.name.endswith('.tmp'):
+        return True
+    try:
+        return now - entry.stat().st_mtime < ORPHAN_PHOTO_GRACE_SECONDS
+    except OSError:
+        return True
+
+def _reconcile_photo_files():
+    """
+    ตรวจฐานข้อมูลกับโฟลเดอร์รูป ครั้งเดียวตอนเริ่มโปรเซส:
+    ลบไฟล์รูป/ภาพย่อที่ไม่มีครูคนไหนอ้างถึง (เช่นโปรเซสหยุดก่อนลบรูปเก่าเสร็จ)
+    และบันทึก log ครูที่ไฟล์รูปหายไป โดยไม่แก้แถวในฐานข้อมูล
+    (โฟลเดอร์รูปอาจแค่ยังไม่ได้ mount หรือชี้ผิดที่ หน้ารายการ/หน้าแก้ไขแสดงเป็น "ไม่มีรูป" เอง).
+    """
+    with os.scandir(UPLOAD_FOLDER) as entries:
+        existing = {e.name: e for e in entries if e.is_file()}
+
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection
+            df = conn.query('SELECT id, photo_path FROM teachers WHERE photo_path IS NOT NULL', ttl=0)
+            photo_paths = {int(row.id): row.photo_path for row in df.itertuples(index=False)}
+        else:
+            # สำหรับ sqlite3 โดยตรง
+            rows = conn.execute('SELECT id, photo_path FROM teachers WHERE photo_path IS NOT NULL')
+            photo_paths = {row['id']: row['photo_path'] for row in rows}
+
+    missing = sorted(teacher_id for teacher_id, path in photo_paths.items() if path not in existing)
+    if missing:
+        logging.getLogger(__name__).warning(
+            "ไม่พบไฟล์รูปของครู %d คนใน %s (id: %s)", len(missing), UPLOAD_FOLDER, ", ".join(map(str, missing))
+        )
+
+    # ลบไฟล์ค้างในเธรดพื้นหลัง ไม่หน่วงการเปิดหน้าแรก
+    referenced = set(photo_paths.values())
+    now = time.time()
+    pool = _file_cleanup_pool()
+    for name, entry in existing.items():
+        if not GENERATED_PHOTO_NAME.fullmatch(name):
+            continue # ไม่ใช่รูปที่แอปบันทึก (เช่น .gitkeep หรือไฟล์ที่วางไว้เอง) ไม่แตะ
+        if name not in referenced and not _recent_or_temp(entry, now):
+            pool.submit(_safe_unlink, entry.path)
+    with os.scandir(THUMBNAIL_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".webp"):
+                continue # ไม่ใช่ภาพย่อที่แอปสร้าง ไม่แตะ
+            photo_name = entry.name.removesuffix(".webp")
+            if entry.is_file() and photo_name not in referenced and not _recent_or_temp(entry, now):
+                pool.submit(_safe_unlink, entry.path)
+
+@st.cache_resource
+def _setup_once():
+    """
+    เรียก setup_database เพียงครั้งเดียวต่อโปรเซส แทนที่จะเรียกทุกครั้งที่สคริปต์รีรัน.
+    """
+    setup_database()
+    return True
+
+@st.cache_resource
+def _teacher_store():
+    """
+    ที่เก็บรายการครูในหน่วยความจำที่ใช้ร่วมกันทุก session (เก็บเรียงตาม id จากน้อยไปมาก).
+    เก็บเฉพาะคอลัมน์ที่หน้ารายการใช้ ส่วนหน้าแก้ไขอ่านข้อมูลเต็มผ่าน get_teacher_by_id_from_db.
+    ใช้ st.cache_resource เพื่อไม่ต้อง pickle/unpickle ทั้งรายการทุกครั้งที่รีรัน
+    และอัปเดตเฉพาะแถวที่เปลี่ยน (อ่านใหม่จากฐานข้อมูล) ทุกครั้งที่มีการเพิ่ม/แก้ไข/ลบ.
+    'version' เพิ่มขึ้นทุกครั้งที่ข้อมูลครูเปลี่ยน ใช้เป็น key ของ cache ที่สร้างจากตารางทั้งตาราง (เช่นไฟล์ Excel).
+    """
+    return {'rows': None, 'version': 0, 'lock': threading.Lock()}
+
+def _list_row(teacher):
+    """
+    ตัดข้อมูลครูหนึ่งแถวให้เหลือเท่าที่หน้ารายการใช้ ให้ตรงกับผลของ TEACHER_LIST_QUERY.
+    '_school_lc' คือสังกัดโรงเรียนตัวพิมพ์เล็กที่เตรียมไว้ให้การค้นหา ไม่ต้อง lower() ทุกแถวทุกครั้งที่ค้น.
+    """
+    return {
+        'id': teacher['id'],
+        'full_name': teacher['full_name'],
+        'position': teacher['position'],
+        'school_affiliation': teacher['school_affiliation'],
+        'major_subject': teacher['major_subject'],
+        'teaching_subjects': teacher['teaching_subjects'][:SUBJECTS_PREVIEW_CHARS] if teacher['teaching_subjects'] is not None else None,
+        'contact_number': teacher['contact_number'],
+        'photo_path': teacher['photo_path'],
+        '_school_lc': (teacher['school_affiliation'] or '').lower(),
+    }
+
+def _store_refresh_teacher(teacher_id):
+    """
+    อ่านข้อมูลครูหนึ่งคนจากฐานข้อมูลใหม่หลัง commit แล้วใส่/แทนที่/ลบในที่เก็บตามที่พบ
+    (ถ้าที่เก็บยังไม่ถูกโหลด จะโหลดใหม่ทั้งหมดในการอ่านครั้งถัดไป).
+    อ่านภายใต้ lock ของที่เก็บ การรีเฟรชจึงเรียงกันและได้ข้อมูลที่ commit ล่าสุดเสมอ:
+    ผลของการเขียนที่เสร็จทีหลังไม่ถูกทับด้วยสำเนาเก่าของผู้เรียก และครูที่ถูกลบแล้วไม่กลับมาในรายการ.
+    """
+    store = _teacher_store()
+    with store['lock']:
+        store['version'] += 1
+        rows = store['rows']
+        if rows is None:
+            return
+        with borrow_conn() as conn:
+            teacher = _fetch_teacher_row(conn, teacher_id)
+        if teacher is None:
+            rows.pop(teacher_id, None)
+        elif teacher_id in rows or not rows or teacher_id > next(reversed(rows)):
+            rows[teacher_id] = _list_row(teacher)
+        else:
+            # ครูใหม่ที่ commit ก่อนแต่รีเฟรชทีหลังครูที่ id มากกว่า: เรียงใหม่ให้ยังเรียงตาม id
+            rows[teacher_id] = _list_row(teacher)
+            store['rows'] = dict(sorted(rows.items()))
+
+def _store_invalidate():
+    """
+    ทิ้งรายการครูในที่เก็บ ให้โหลดใหม่ทั้งหมดจากฐานข้อมูลในการอ่านครั้งถัดไป.
+    """
+    store = _teacher_store()
+    with store['lock']:
+        store['version'] += 1
+        store['rows'] = None
+
+# อ่านเฉพาะคอลัมน์ที่หน้ารายการแสดง และตัด 'สอนรายวิชา' ให้สั้นตั้งแต่ใน SQLite
+TEACHER_LIST_QUERY = f"""
+    SELECT id, full_name, position, school_affiliation, major_subject,
+           substr(teaching_subjects, 1, {SUBJECTS_PREVIEW_CHARS}) AS teaching_subjects,
+           contact_number, photo_path
+    FROM teachers ORDER BY id
+"""
 
-@st.cache_data(ttl=3600)
 def get_all_teachers_from_db_cached():
     """
-    ดึงข้อมูลครูทั้งหมดจากฐานข้อมูลและเก็บไว้ใน cache เพื่อประสิทธิภาพ.
+    ดึงข้อมูลครูทั้งหมดจากที่เก็บในหน่วยความจำ โดยอ่านจากฐานข้อมูลเพียงครั้งแรกครั้งเดียว.
+    ส่งคืนเรียงจากครูที่เพิ่มล่าสุดก่อน. ผู้เรียกห้ามแก้ไข dict ที่ได้รับ เพราะใช้ร่วมกันทุก session.
     """
-    conn = get_db_connection()
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection
-        df = conn.query('SELECT * FROM teachers', ttl=0) 
-        return df.to_dict(orient='records')
-    else:
-        # สำหรับ sqlite3 โดยตรง
-        cursor = conn.cursor()
-        teachers = cursor.execute('SELECT * FROM teachers').fetchall()
-        conn.close()
-        return [dict(t) for t in teachers]
+    store = _teacher_store()
+    with store['lock']:
+        if store['rows'] is None:
+            with borrow_conn() as conn:
+                if hasattr(conn, 'session'):
+                    # สำหรับ st.connection
+                    df = conn.query(TEACHER_LIST_QUERY, ttl=0)
+                    # pandas แปลง NULL เป็น NaN: แปลงกลับเป็น None ให้เหมือนแถวจาก sqlite3 และ _fetch_teacher_row
+                    teachers = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+                else:
+                    # สำหรับ sqlite3 โดยตรง: อ่านทีละแถวจาก cursor ไม่สร้าง list กลางทาง
+                    teachers = (dict(t) for t in conn.execute(TEACHER_LIST_QUERY))
+                store['rows'] = {t['id']: _list_row(t) for t in teachers}
+        # คัดลอกเป็น list ภายใต้ lock เพราะ session อื่นอาจแก้ไขที่เก็บระหว่างที่หน้านี้กำลังวนอ่าน
+        return list(reversed(store['rows'].values())) # id มากสุด (เพิ่มล่าสุด) อยู่บนสุด
+
+def get_teachers_page(teachers, before_id=None, page_size=TEACHERS_PAGE_SIZE):
+    """
+    แบ่งหน้ารายการครู (เรียง id มากไปน้อย) แบบ keyset: เอาครูที่ id น้อยกว่า before_id มา page_size คน.
+    ใช้ id ของแถวสุดท้ายเป็นเคอร์เซอร์แทน OFFSET จึงไม่เลื่อนผิดคนเมื่อมีการเพิ่ม/ลบระหว่างเปลี่ยนหน้า.
+    ส่งคืน (รายการครูในหน้านี้, เคอร์เซอร์ของหน้าก่อนหน้า, มีหน้าก่อนหน้าหรือไม่, มีหน้าถัดไปหรือไม่, เลขหน้า).
+    """
+    start = 0
+    if before_id is not None:
+        start = next((i for i, t in enumerate(teachers) if t['id'] < before_id), len(teachers))
+        if start == len(teachers) and teachers:
+            # เคอร์เซอร์เลยท้ายรายการ (เช่นลบครูคนสุดท้ายของหน้า) ให้แสดงหน้าสุดท้ายแทน
+            start = max(0, len(teachers) - page_size)
+    page = teachers[start:start + page_size]
+    prev_start = max(0, start - page_size)
+    prev_before_id = teachers[prev_start - 1]['id'] if prev_start > 0 else None
+    return page, prev_before_id, start > 0, start + page_size < len(teachers), start // page_size + 1
+
+def _thumbnail_file(photo_name):
+    """
+    ตำแหน่งไฟล์ภาพย่อของรูปครู (อ้างอิงจากชื่อไฟล์รูป จึงไม่ต้องมีคอลัมน์เพิ่มในฐานข้อมูล).
+    """
+    return os.path.join(THUMBNAIL_FOLDER, os.path.basename(photo_name) + ".webp")
+
+def _thumbnail_bytes(im):
+    """
+    ย่อรูปที่ถอดรหัสแล้วเป็นภาพย่อ WEBP ขนาดไม่เกิน THUMBNAIL_SIZE (ไม่แก้ไขรูปที่ส่งเข้ามา).
+    """
+    im = im.convert("RGBA") if im.mode not in ("RGB", "RGBA") else im.copy()
+    im.thumbnail(THUMBNAIL_SIZE)
+    buf = io.BytesIO()
+    im.save(buf, format="WEBP", quality=80)
+    return buf.getvalue()
+
+def _make_thumbnail(path):
+    """
+    ถอดรหัสรูปต้นฉบับแล้วย่อเป็นภาพย่อ WEBP ขนาดไม่เกิน THUMBNAIL_SIZE.
+    """
+    with Image.open(path) as im:
+        return _thumbnail_bytes(im)
+
+def _save_thumbnail(path, thumbnail=None):
+    """
+    บันทึกภาพย่อของรูปลงดิสก์ (เขียนไฟล์ชั่วคราวแล้ว os.replace) คืนค่า bytes ของภาพย่อ.
+    """
+    if thumbnail is None:
+        thumbnail = _make_thumbnail(path)
+    thumb_path = _thumbnail_file(path)
+    tmp_path = thumb_path + ".tmp"
+    os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(thumbnail)
+    os.replace(tmp_path, thumb_path)
+    return thumbnail
+
+@st.cache_resource
+def _file_cleanup_pool():
+    """
+    เธรดพื้นหลังสำหรับลบไฟล์รูปเก่า ใช้ร่วมกันทั้งโปรเซส
+    เพื่อไม่ให้เวลาลบไฟล์ (เช่นบนดิสก์เครือข่าย) ไปหน่วงการกดบันทึก/ลบของผู้ใช้.
+    """
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="photo-cleanup")
+
+def _safe_unlink(path):
+    """
+    ลบไฟล์ โดยไม่ถือว่าผิดพลาดถ้าไฟล์ไม่มีอยู่แล้วหรือลบไม่ได้.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass # ลบไม่ได้ก็เหลือแค่ไฟล์ค้าง ฐานข้อมูลไม่ได้อ้างถึงแล้ว
+
+def _remove_photo_files(photo_name):
+    """
+    ส่งไฟล์รูปและภาพย่อของรูปที่ถูกลบหรือถูกแทนที่ไปลบในเธรดพื้นหลัง.
+    เรียกหลังบันทึกฐานข้อมูลสำเร็จแล้วเท่านั้น.
+    """
+    pool = _file_cleanup_pool()
+    pool.submit(_safe_unlink, os.path.join(UPLOAD_FOLDER, photo_name))
+    pool.submit(_safe_unlink, _thumbnail_file(photo_name))
+
+@st.cache_data(max_entries=TEACHER_CACHE_MAX_ENTRIES, show_spinner=False)
+def _photo_thumbnail(path):
+    """
+    อ่านภาพย่อ (WEBP) ที่สร้างไว้ตอนอัปโหลด แล้วเก็บ bytes ไว้ใน cache ตาม path
+    (ชื่อไฟล์รูปสุ่มใหม่ทุกครั้งที่อัปโหลดและไม่ถูกเขียนทับ จึงไม่ต้องใช้ mtime เป็น key).
+    รูปเก่าที่ยังไม่มีภาพย่อจะถูกย่อจากต้นฉบับครั้งเดียวแล้วบันทึกเก็บไว้ใช้หลังรีสตาร์ท.
+    """
+    try:
+        with open(_thumbnail_file(path), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    thumbnail = _make_thumbnail(path)
+    try:
+        _save_thumbnail(path, thumbnail)
+    except OSError:
+        pass # เขียนไม่ได้ (เช่นดิสก์อ่านอย่างเดียว) ก็ยังใช้ภาพย่อใน cache ได้
+    return thumbnail
+
+@st.cache_data(max_entries=TEACHER_CACHE_MAX_ENTRIES, show_spinner=False)
+def _photo_thumbnail_url(path):
+    """
+    URL ของภาพย่อสำหรับ st.column_config.ImageColumn ในตารางรายชื่อครู.
+    ถ้าเปิด static serving ไว้ ส่งเป็นลิงก์ให้เบราว์เซอร์โหลดเองแทนการฝังรูปใน WebSocket ทุกรอบรีรัน
+    (รูปเก่าที่ยังไม่มีไฟล์ภาพย่อจะถูกสร้างก่อน). ไม่เช่นนั้นใช้ data URI แทน.
+    """
+    if not st.get_option('server.enableStaticServing'):
+        return _photo_thumbnail_uri(path)
+    try:
+        if not os.path.exists(_thumbnail_file(path)):
+            _save_thumbnail(path)
+    except Exception:
+        return _photo_thumbnail_uri(path) # สร้างไฟล์ภาพย่อไม่ได้ ก็ยังฝังจากภาพย่อใน cache ได้
+    # ชื่อไฟล์รูปเก่าอาจมีช่องว่าง, #, ? หรือ % ซึ่งต้อง encode ก่อนต่อเป็น URL
+    return THUMBNAIL_URL_PREFIX + quote(os.path.basename(_thumbnail_file(path)))
+
+@st.cache_data(max_entries=TEACHER_CACHE_MAX_ENTRIES, show_spinner=False)
+def _photo_thumbnail_uri(path):
+    """
+    ภาพย่อในรูป data URI สำหรับ st.column_config.ImageColumn ในตารางรายชื่อครู.
+    ส่งคืน None หากไฟล์รูปเสียหรือเปิดไม่ได้ เพื่อไม่ให้ทั้งตารางแสดงผลไม่ได้.
+    """
+    try:
+        thumbnail = _photo_thumbnail(path)
+    except Exception:
+        return None
+    return "data:image/webp;base64," + base64.b64encode(thumbnail).decode("ascii")
 
 def export_teachers_to_excel():
     """
     ส่งออกข้อมูลครูทั้งหมดเป็นไฟล์ Excel (.xlsx).
+    ปุ่มดาวน์โหลดเรียกทุกครั้งที่รีรัน จึงสร้างไฟล์ใหม่เฉพาะเมื่อข้อมูลครูเปลี่ยน (ตาม version ของที่เก็บ).
     """
-    conn = get_db_connection()
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection
-        df = conn.query('SELECT * FROM teachers', ttl=0)
-    else:
-        # สำหรับ sqlite3 โดยตรง
-        cursor = conn.cursor()
-        # เลือกคอลัมน์ทั้งหมด รวมถึง 'position'
-        cursor.execute("SELECT id, full_name, school_affiliation, position, major_subject, teaching_subjects, contact_number, photo_path FROM teachers")
-        data = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        conn.close()
-        df = pd.DataFrame(data, columns=column_names)
-
-    # เปลี่ยนชื่อคอลัมน์ให้เป็นภาษาไทยที่เข้าใจง่าย
-    df.rename(columns={
-        'id': 'รหัสครู',
-        'full_name': 'ชื่อ-สกุล',
-        'school_affiliation': 'สังกัดโรงเรียน',
-        'position': 'ตำแหน่ง', 
-        'major_subject': 'วิชาเอก',
-        'teaching_subjects': 'สอนรายวิชา',
-        'contact_number': 'เบอร์ติดต่อ',
-        'photo_path': 'เส้นทางไฟล์รูปภาพ'
-    }, inplace=True)
-    
-    # บันทึกเป็นไฟล์ Excel
-    output = pd.ExcelWriter('teachers_data.xlsx', engine='xlsxwriter')
-    df.to_excel(output, index=False, sheet_name='ข้อมูลครู')
-    output.close() 
+    return _build_excel_bytes(_teacher_store()['version'])
 
-    # อ่านไฟล์ Excel และส่งกลับข้อมูล
-    with open('teachers_data.xlsx', 'rb') as f:
-        file_data = f.read()
-    os.remove('teachers_data.xlsx') # ลบไฟล์ชั่วคราว
-    return file_data
+# คอลัมน์ที่ส่งออกเป็น Excel ตามลำดับ พร้อมหัวคอลัมน์ภาษาไทยที่เข้าใจง่าย
+EXPORT_COLUMNS = (
+    ('id', 'รหัสครู'),
+    ('full_name', 'ชื่อ-สกุล'),
+    ('school_affiliation', 'สังกัดโรงเรียน'),
+    ('position', 'ตำแหน่ง'),
+    ('major_subject', 'วิชาเอก'),
+    ('teaching_subjects', 'สอนรายวิชา'),
+    ('contact_number', 'เบอร์ติดต่อ'),
+    ('photo_path', 'เส้นทางไฟล์รูปภาพ'),
+)
+EXPORT_QUERY = f"SELECT {', '.join(col for col, _ in EXPORT_COLUMNS)} FROM teachers ORDER BY id"
 
-def get_teacher_by_id_from_db(teacher_id):
+@st.cache_data(ttl=3600, max_entries=1, show_spinner=False)
+def _build_excel_bytes(store_version):
     """
-    ดึงข้อมูลครูตาม ID ที่ระบุ.
+    สร้างไฟล์ Excel ของข้อมูลครูทั้งหมดในหน่วยความจำ (store_version ใช้เป็น key ของ cache เท่านั้น).
+    เขียนทีละแถวจาก cursor ลง xlsxwriter โดยตรง ไม่ต้องสร้าง DataFrame กลางทาง.
+    """
+    buf = io.BytesIO()
+    # in_memory: ไม่เขียนไฟล์ชั่วคราวลงดิสก์ระหว่างสร้าง (constant_memory ต้องใช้ไฟล์ชั่วคราวต่อ worksheet)
+    workbook = xlsxwriter.Workbook(buf, {'in_memory': True})
+    worksheet = workbook.add_worksheet('ข้อมูลครู')
+    worksheet.write_row(0, 0, [header for _, header in EXPORT_COLUMNS])
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection
+            with conn.session as s:
+                for row_num, row in enumerate(s.execute(text(EXPORT_QUERY)), start=1):
+                    worksheet.write_row(row_num, 0, row)
+        else:
+            # สำหรับ sqlite3 โดยตรง
+            for row_num, row in enumerate(conn.execute(EXPORT_QUERY), start=1):
+                worksheet.write_row(row_num, 0, row)
+    workbook.close()
+    return buf.getvalue()
+
+def _write_photo_file(photo_file, dest_path):
+    """
+    ย่อรูปที่อัปโหลดให้ไม่เกิน PHOTO_MAX_SIZE แล้วบันทึกเป็น JPEG ลงไฟล์ชั่วคราว
+    และย้ายเข้าที่ด้วย os.replace เพื่อไม่ให้หน้ารายการเห็นไฟล์รูปที่เขียนไม่ครบ.
+    สร้างภาพย่อจากรูปที่ถอดรหัสแล้วในหน่วยความจำต่อเลย ไม่ต้องอ่านไฟล์ที่เพิ่งเขียนกลับมาอีกรอบ.
+    """
+    tmp_path = dest_path + ".tmp"
+    try:
+        photo_file.seek(0)
+        with Image.open(photo_file) as im:
+            im = ImageOps.exif_transpose(im) # หมุนรูปจากมือถือตาม EXIF ก่อน เพราะ JPEG ใหม่ไม่เก็บ EXIF เดิม
+            im.thumbnail(PHOTO_MAX_SIZE)
+            if im.mode != "RGB":
+                # JPEG ไม่มีความโปร่งใส: วางบนพื้นขาวแทนการปล่อยให้ส่วนโปร่งใสกลายเป็นสีดำ
+                im = im.convert("RGBA")
+                background = Image.new("RGB", im.size, "white")
+                background.paste(im, mask=im.getchannel("A"))
+                im = background
+            im.save(tmp_path, format="JPEG", quality=PHOTO_JPEG_QUALITY, optimize=True)
+        os.replace(tmp_path, dest_path) # atomic บน POSIX
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    try:
+        _save_thumbnail(dest_path, _thumbnail_bytes(im)) # สร้างภาพย่อไว้เลย หน้ารายการจะได้ไม่ต้องถอดรหัสรูปเต็ม
+    except Exception:
+        pass # สร้างภาพย่อไม่ได้: หน้ารายการจะลองย่อเองอีกครั้ง
+
+def _save_uploaded_photo(photo_file):
+    """
+    บันทึกรูปที่อัปโหลดลงโฟลเดอร์ด้วยชื่อไฟล์สุ่ม แล้วคืนชื่อไฟล์สำหรับเก็บในฐานข้อมูล.
+    ตรวจนามสกุลซ้ำที่นี่ เพราะ type= ของ st.file_uploader กรองได้เฉพาะในหน้าต่างเลือกไฟล์.
+    """
+    extension = os.path.splitext(photo_file.name)[1].lower()
+    if extension not in ALLOWED_PHOTO_EXTENSIONS:
+        raise ValueError(f"ไม่รองรับไฟล์นามสกุล '{extension}'")
+    if photo_file.size > MAX_PHOTO_BYTES:
+        raise ValueError(f"ไฟล์รูปใหญ่เกิน {MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+    # ตรวจว่าเป็นรูปภาพจริงในหน่วยความจำก่อนเขียนลงดิสก์ (verify อ่านแค่โครงสร้างไฟล์ ไม่ถอดรหัสทั้งรูป)
+    try:
+        photo_file.seek(0)
+        with Image.open(photo_file) as im:
+            im.verify()
+    except Exception:
+        raise ValueError("ไฟล์ที่อัปโหลดไม่ใช่รูปภาพหรือไฟล์เสียหาย")
+    # ตั้งชื่อไฟล์แบบสุ่มทั้งหมด ไม่ใช้ชื่อเดิมของผู้ใช้ (กัน path traversal และปัญหา unicode)
+    # นามสกุลเป็น .jpg เสมอ เพราะรูปทุกไฟล์ถูกบันทึกใหม่เป็น JPEG
+    new_filename = f"{secrets.token_hex(16)}.jpg"
+    _write_photo_file(photo_file, os.path.join(UPLOAD_FOLDER, new_filename))
+    return new_filename
+
+def _fetch_teacher_row(conn, teacher_id):
+    """
+    อ่านข้อมูลครูหนึ่งแถวจากการเชื่อมต่อที่ยืมมาแล้ว (ใช้ร่วมกับ transaction ของผู้เรียกได้).
     """
-    conn = get_db_connection()
     if hasattr(conn, 'session'):
-        # สำหรับ st.connection
-        try:
-            teacher = conn.query(f'SELECT * FROM teachers WHERE id = {teacher_id}', ttl=0).iloc[0].to_dict()
-            return teacher
-        except IndexError:
-            return None # ไม่พบข้อมูล
+        # สำหรับ st.connection: อ่านแถวเดียวผ่าน session โดยตรง ไม่สร้าง DataFrame
+        # (และค่า NULL ยังเป็น None ไม่กลายเป็น NaN ซึ่งใช้เทียบค่าเดิมตอน UPDATE ได้ถูกต้อง)
+        with conn.session as s:
+            # ใช้ bound parameter แทน f-string เพื่อกัน SQL injection และให้ใช้ statement ที่คอมไพล์แล้วซ้ำได้
+            teacher = s.execute(text('SELECT * FROM teachers WHERE id = :id'), {'id': teacher_id}).mappings().first()
+        return dict(teacher) if teacher else None
     else:
         # สำหรับ sqlite3 โดยตรง
-        cursor = conn.cursor()
-        teacher = cursor.execute('SELECT * FROM teachers WHERE id = ?', (teacher_id,)).fetchone()
-        conn.close()
+        teacher = conn.execute('SELECT * FROM teachers WHERE id = ?', (teacher_id,)).fetchone()
         return dict(teacher) if teacher else None
 
+@st.cache_data(max_entries=TEACHER_CACHE_MAX_ENTRIES, show_spinner=False)
+def get_teacher_by_id_from_db(teacher_id):
+    """
+    ดึงข้อมูลครูตาม ID ที่ระบุ (cache แยกตาม ID และถูกล้างเมื่อครูคนนั้นถูกแก้ไขหรือลบ).
+    """
+    with borrow_conn() as conn:
+        return _fetch_teacher_row(conn, teacher_id)
+
+# คำสั่ง INSERT เก็บเป็นค่าคงที่ระดับโมดูล ใช้ข้อความเดียวกันทุกครั้งทั้งสองแบบการเชื่อมต่อ
+# เพื่อให้ statement cache ของ sqlite3 ใช้คำสั่งที่คอมไพล์แล้วซ้ำได้
+BULK_INSERT_TEACHERS_QUERY = """
+    INSERT INTO teachers (full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_path, position)
+    VALUES (:full_name, :school_affiliation, :major_subject, :teaching_subjects, :contact_number, :photo_path, :position)
+"""
+INSERT_TEACHER_QUERY = BULK_INSERT_TEACHERS_QUERY + "    RETURNING id\n"
+
 def add_teacher_to_db(full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_file=None, position=None):
     """
     เพิ่มข้อมูลครูใหม่ลงในฐานข้อมูล.
     """
-    conn = get_db_connection()
     saved_photo_path = None
     if photo_file:
         try:
             # บันทึกรูปภาพลงในโฟลเดอร์ UPLOAD_FOLDER ด้วยชื่อไฟล์ที่ไม่ซ้ำกัน
-            extension = os.path.splitext(photo_file.name)[1]
-            new_filename = f"{os.path.splitext(photo_file.name)[0]}_{os.urandom(8).hex()}{extension}"
-            saved_photo_path_full = os.path.join(UPLOAD_FOLDER, new_filename)
-            
-            with open(saved_photo_path_full, "wb") as f:
-                f.write(photo_file.getbuffer())
-            saved_photo_path = new_filename # เก็บเฉพาะชื่อไฟล์สำหรับฐานข้อมูล
-            st.toast(f"บันทึกรูปภาพ: {saved_photo_path_full}", icon="📸")
+            saved_photo_path = _save_uploaded_photo(photo_file) # เก็บเฉพาะชื่อไฟล์สำหรับฐานข้อมูล
+            st.toast(f"บันทึกรูปภาพ: {os.path.join(UPLOAD_FOLDER, saved_photo_path)}", icon="📸")
         except Exception as e:
             st.error(f"เกิดข้อผิดพลาดในการบันทึกรูปภาพ: {e}")
             saved_photo_path = None
 
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection
-        with conn.session as s:
-            s.execute('''
-                INSERT INTO teachers (full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_path, position)
-                VALUES (:full_name, :school_affiliation, :major_subject, :teaching_subjects, :contact_number, :photo_path, :position)
-            ''', params=dict(
-                full_name=full_name,
-                school_affiliation=school_affiliation,
-                major_subject=major_subject,
-                teaching_subjects=teaching_subjects,
-                contact_number=contact_number,
-                photo_path=saved_photo_path,
-                position=position
-            ))
-            s.commit()
-    else:
-        # สำหรับ sqlite3 โดยตรง
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO teachers (full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_path, position)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (full_name, school_affiliation, major_subject, teaching_subjects, contact_number, saved_photo_path, position))
-        conn.commit()
-        conn.close()
-    st.cache_data.clear() # ล้าง cache เพื่อให้ข้อมูลล่าสุดถูกดึงมาแสดง
+    params = dict(
+        full_name=full_name,
+        school_affiliation=school_affiliation,
+        major_subject=major_subject,
+        teaching_subjects=teaching_subjects,
+        contact_number=contact_number,
+        photo_path=saved_photo_path,
+        position=position
+    )
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection
+            with conn.session as s:
+                new_teacher = s.execute(text(INSERT_TEACHER_QUERY), params).mappings().fetchone()
+                s.commit()
+        else:
+            # สำหรับ sqlite3 โดยตรง
+            new_teacher = conn.execute(INSERT_TEACHER_QUERY, params).fetchone()
+            conn.commit()
+    _store_refresh_teacher(new_teacher['id']) # อัปเดตที่เก็บรายการครูจากแถวที่ commit แล้ว
     st.success(f"เพิ่มข้อมูลครู '{full_name}' สำเร็จ!")
 
-def update_teacher_in_db(teacher_id, full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_file=None, position=None):
+def add_teachers_bulk(rows):
     """
-    แก้ไขข้อมูลครูในฐานข้อมูลตาม ID ที่ระบุ.
+    เพิ่มข้อมูลครูหลายคนในครั้งเดียว (rows เป็น list ของ dict ตามพารามิเตอร์ของ BULK_INSERT_TEACHERS_QUERY).
+    ใส่ทุกแถวใน transaction เดียวด้วย executemany ทีละ IMPORT_CHUNK_ROWS แถว
+    แล้วให้ที่เก็บรายการครูโหลดใหม่ครั้งเดียวตอนจบ. ส่งคืนจำนวนแถวที่เพิ่ม.
     """
-    conn = get_db_connection()
-    current_teacher = get_teacher_by_id_from_db(teacher_id)
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection: ส่ง list ของ dict ให้ SQLAlchemy ทำ executemany
+            with conn.session as s:
+                for start in range(0, len(rows), IMPORT_CHUNK_ROWS):
+                    s.execute(text(BULK_INSERT_TEACHERS_QUERY), rows[start:start + IMPORT_CHUNK_ROWS])
+                s.commit()
+        else:
+            # สำหรับ sqlite3 โดยตรง: การเชื่อมต่อเป็น autocommit จึงเปิด transaction เอง
+            conn.execute('BEGIN')
+            for start in range(0, len(rows), IMPORT_CHUNK_ROWS):
+                conn.executemany(BULK_INSERT_TEACHERS_QUERY, rows[start:start + IMPORT_CHUNK_ROWS])
+            conn.commit()
+
+    _store_invalidate() # โหลดรายการครูใหม่ครั้งเดียวในการอ่านครั้งถัดไป แทนการ upsert ทีละแถว
+    return len(rows)
+
+def import_teachers_from_csv(csv_file):
+    """
+    นำเข้าข้อมูลครูหลายคนจากไฟล์ CSV (หัวคอลัมน์ตาม IMPORT_CSV_COLUMNS, ต้องมี full_name)
+    ผ่าน add_teachers_bulk. ส่งคืนจำนวนแถวที่นำเข้า.
+    """
+    try:
+        df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+    except Exception as e:
+        st.error(f"อ่านไฟล์ CSV ไม่ได้: {e}")
+        return 0
+    df.columns = df.columns.str.strip()
+    if 'full_name' not in df.columns:
+        st.error("ไฟล์ CSV ต้องมีคอลัมน์ full_name")
+        return 0
 
+    df = df[df['full_name'].str.strip() != ""] # ข้ามแถวที่ไม่มีชื่อ-สกุล เหมือนฟอร์มเพิ่มครู
+    rows = [
+        {**{col: row.get(col) for col in IMPORT_CSV_COLUMNS}, 'photo_path': None}
+        for row in df.to_dict(orient='records')
+    ]
+    if not rows:
+        st.warning("ไม่มีข้อมูลครูในไฟล์ CSV")
+        return 0
+
+    add_teachers_bulk(rows)
+    st.success(f"นำเข้าข้อมูลครู {len(rows)} คนสำเร็จ!")
+    return len(rows)
+
+# คำสั่ง UPDATE แบบคงที่ชุดเดียว ใช้ได้ทั้ง st.connection และ sqlite3 (Named Parameters ทั้งคู่)
+# คอลัมน์ที่ส่งค่าเป็น NULL จะคงค่าเดิม และ WHERE ตรวจว่าคอลัมน์ที่จะเขียนยังเป็นค่าเดิมที่ผู้ใช้เห็น
+# (optimistic concurrency: IS เทียบ NULL ได้) ถ้ามีคนแก้คอลัมน์เดียวกันไปก่อนจะไม่มีแถวถูกอัปเดต
+UPDATE_TEACHER_QUERY = """
+    UPDATE teachers SET
+        full_name = COALESCE(:full_name, full_name),
+        school_affiliation = COALESCE(:school_affiliation, school_affiliation),
+        major_subject = COALESCE(:major_subject, major_subject),
+        teaching_subjects = COALESCE(:teaching_subjects, teaching_subjects),
+        contact_number = COALESCE(:contact_number, contact_number),
+        position = COALESCE(:position, position),
+        photo_path = CASE WHEN :set_photo THEN :photo_path ELSE photo_path END
+    WHERE id = :id
+        AND (:full_name IS NULL OR full_name IS :old_full_name)
+        AND (:school_affiliation IS NULL OR school_affiliation IS :old_school_affiliation)
+        AND (:major_subject IS NULL OR major_subject IS :old_major_subject)
+        AND (:teaching_subjects IS NULL OR teaching_subjects IS :old_teaching_subjects)
+        AND (:contact_number IS NULL OR contact_number IS :old_contact_number)
+        AND (:position IS NULL OR position IS :old_position)
+        AND (NOT :set_photo OR photo_path IS :old_photo_path)
+    RETURNING id
+"""
+UPDATE_TEACHER_TEXT_COLUMNS = ('full_name', 'school_affiliation', 'major_subject', 'teaching_subjects', 'contact_number', 'position')
+
+def update_teacher_in_db(teacher_id, full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_file=None, position=None, current_teacher=None):
+    """
+    แก้ไขข้อมูลครูในฐานข้อมูลตาม ID ที่ระบุ.
+    current_teacher คือข้อมูลครูที่ผู้ใช้เห็นตอนเปิดฟอร์มแก้ไข ใช้เทียบหาคอลัมน์ที่เปลี่ยนโดยไม่ต้อง SELECT ซ้ำ
+    และใช้ตรวจว่าไม่มีใครแก้คอลัมน์เดียวกันไปก่อน (optimistic concurrency) แล้วจึงลบไฟล์รูปเดิมหลังบันทึกสำเร็จ.
+    """
+    old_photo_to_remove = None # รูปเดิมที่ต้องลบหลังบันทึกฐานข้อมูลสำเร็จ
+    if current_teacher is None:
+        current_teacher = get_teacher_by_id_from_db(teacher_id)
     if not current_teacher:
         st.error("ไม่พบครูที่ต้องการแก้ไข")
         return False
 
-    updates = []
-    # ใช้ List สำหรับเก็บค่าพารามิเตอร์แบบ Positional สำหรับ sqlite3 โดยตรง
-    params = [] 
-
-    # ตรวจสอบว่ามีการเปลี่ยนแปลงข้อมูลในแต่ละฟิลด์หรือไม่
-    if full_name is not None and full_name != current_teacher['full_name']:
-        updates.append("full_name = ?")
-        params.append(full_name)
-    if school_affiliation is not None and school_affiliation != current_teacher['school_affiliation']:
-        updates.append("school_affiliation = ?")
-        params.append(school_affiliation)
-    if major_subject is not None and major_subject != current_teacher['major_subject']:
-        updates.append("major_subject = ?")
-        params.append(major_subject)
-    if teaching_subjects is not None and teaching_subjects != current_teacher['teaching_subjects']:
-        updates.append("teaching_subjects = ?")
-        params.append(teaching_subjects)
-    if contact_number is not None and contact_number != current_teacher['contact_number']:
-        updates.append("contact_number = ?")
-        params.append(contact_number)
-    # เพิ่มการอัปเดตตำแหน่ง
-    if position is not None and position != current_teacher.get('position', ''): 
-        updates.append("position = ?")
-        params.append(position)
-    
-    saved_photo_path = None # กำหนดค่าเริ่มต้นสำหรับ saved_photo_path
+    # เก็บเฉพาะคอลัมน์ที่มีการเปลี่ยนแปลง (ชื่อคอลัมน์ -> ค่าใหม่) ใช้ร่วมกันทั้งสองแบบการเชื่อมต่อ
+    changes = {}
+
+    # ตรวจสอบว่ามีการเปลี่ยนแปลงข้อมูลในแต่ละฟิลด์หรือไม่ (None = ไม่ได้ส่งค่ามา)
+    new_values = dict(
+        full_name=full_name,
+        school_affiliation=school_affiliation,
+        major_subject=major_subject,
+        teaching_subjects=teaching_subjects,
+        contact_number=contact_number,
+        position=position,
+    )
+    for col in UPDATE_TEACHER_TEXT_COLUMNS:
+        if new_values[col] is not None and new_values[col] != current_teacher[col]:
+            changes[col] = new_values[col]
+
     if photo_file:
-        # ถ้ามีไฟล์รูปภาพใหม่ถูกอัปโหลด
-        if current_teacher and current_teacher['photo_path']:
-            # ลบรูปภาพเก่าออกก่อน
-            old_photo_full_path = os.path.join(UPLOAD_FOLDER, current_teacher['photo_path'])
-            if os.path.exists(old_photo_full_path):
-                try:
-                    os.remove(old_photo_full_path)
-                    st.info(f"ลบรูปภาพเก่า: {old_photo_full_path}")
-                except Exception as e:
-                    st.warning(f"เกิดข้อผิดพลาดในการลบรูปภาพเก่า: {e}")
+        # ถ้ามีไฟล์รูปภาพใหม่ถูกอัปโหลด: บันทึกก่อนยืมการเชื่อมต่อ ไม่ถือการเชื่อมต่อค้างไว้ระหว่างย่อ/บีบอัดรูป
         try:
             # บันทึกรูปภาพใหม่
-            extension = os.path.splitext(photo_file.name)[1]
-            new_filename = f"{os.path.splitext(photo_file.name)[0]}_{os.urandom(8).hex()}{extension}"
-            saved_photo_path_full = os.path.join(UPLOAD_FOLDER, new_filename)
-            with open(saved_photo_path_full, "wb") as f:
-                f.write(photo_file.getbuffer())
-            saved_photo_path = new_filename
-            updates.append("photo_path = ?")
-            params.append(saved_photo_path)
-            st.toast(f"บันทึกรูปภาพใหม่: {saved_photo_path_full}", icon="📸")
+            changes['photo_path'] = _save_uploaded_photo(photo_file)
+            old_photo_to_remove = current_teacher['photo_path']
+            st.toast(f"บันทึกรูปภาพใหม่: {os.path.join(UPLOAD_FOLDER, changes['photo_path'])}", icon="📸")
         except Exception as e:
             st.error(f"เกิดข้อผิดพลาดในการบันทึกรูปภาพใหม่: {e}")
-            
+
     elif st.session_state.get('photo_cleared', False):
         # ถ้า checkbox 'ลบรูปภาพปัจจุบัน' ถูกเลือก
-        if current_teacher and current_teacher['photo_path']:
-            old_photo_full_path = os.path.join(UPLOAD_FOLDER, current_teacher['photo_path'])
-            if os.path.exists(old_photo_full_path):
-                try:
-                    os.remove(old_photo_full_path)
-                    st.info(f"ลบรูปภาพ (ตามคำสั่ง): {old_photo_full_path}")
-                except Exception as e:
-                    st.warning(f"เกิดข้อผิดพลาดในการลบรูปภาพ (ตามคำสั่ง): {e}")
-        updates.append("photo_path = ?")
-        params.append(None) # ตั้งค่า photo_path เป็น NULL ในฐานข้อมูล
-
-    if not updates:
+        changes['photo_path'] = None # ตั้งค่า photo_path เป็น NULL ในฐานข้อมูล
+        old_photo_to_remove = current_teacher['photo_path']
+
+    if not changes:
         st.info("ไม่มีข้อมูลที่เปลี่ยนแปลง")
         return False
 
-    params.append(teacher_id) # เพิ่ม ID ของครูเป็นพารามิเตอร์สุดท้ายสำหรับ WHERE clause
-    # สร้างคำสั่ง SQL สำหรับ UPDATE โดยใช้ Positional Parameters (?)
-    query = f"UPDATE teachers SET {', '.join(updates)} WHERE id = ?"
-    
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection (ใช้ Named Parameters)
-        named_params = {}
-        # คัดลอกค่าจาก params list ไปยัง named_params dictionary
-        # ตรวจสอบและเพิ่มเฉพาะคอลัมน์ที่มีการเปลี่ยนแปลง
-        if full_name is not None and full_name != current_teacher['full_name']:
-            named_params['full_name'] = full_name
-        if school_affiliation is not None and school_affiliation != current_teacher['school_affiliation']:
-            named_params['school_affiliation'] = school_affiliation
-        if major_subject is not None and major_subject != current_teacher['major_subject']:
-            named_params['major_subject'] = major_subject
-        if teaching_subjects is not None and teaching_subjects != current_teacher['teaching_subjects']:
-            named_params['teaching_subjects'] = teaching_subjects
-        if contact_number is not None and contact_number != current_teacher['contact_number']:
-            named_params['contact_number'] = contact_number
-        if position is not None and position != current_teacher.get('position', ''):
-            named_params['position'] = position
-
-        # จัดการ photo_path สำหรับ named_params
-        if photo_file:
-            # ต้องสร้าง saved_photo_path อีกครั้งเพื่อให้ named_params มีค่าที่ถูกต้อง
-            try:
-                extension = os.path.splitext(photo_file.name)[1]
-                new_filename = f"{os.path.splitext(photo_file.name)[0]}_{os.urandom(8).hex()}{extension}"
-                saved_photo_path_full = os.path.join(UPLOAD_FOLDER, new_filename)
-                with open(saved_photo_path_full, "wb") as f:
-                    f.write(photo_file.getbuffer())
-                saved_photo_path = new_filename
-                named_params['photo_path'] = saved_photo_path
-            except Exception as e:
-                st.error(f"เกิดข้อผิดพลาดในการบันทึกรูปภาพใหม่: {e}")
-                named_params['photo_path'] = None 
-        elif st.session_state.get('photo_cleared', False):
-            named_params['photo_path'] = None
-
-        named_params['id'] = teacher_id
-        
-        # สร้าง query string ที่มี named parameters สำหรับ st.connection
-        # เฉพาะคอลัมน์ที่อยู่ใน named_params (ยกเว้น 'id')
-        named_updates_clause = []
-        for key in named_params.keys():
-            if key != 'id': 
-                named_updates_clause.append(f"{key} = :{key}")
-        named_query = f"UPDATE teachers SET {', '.join(named_updates_clause)} WHERE id = :id"
+    # คอลัมน์ที่ไม่เปลี่ยนส่งเป็น None ให้ COALESCE คงค่าเดิม พร้อมค่าเดิมที่ผู้ใช้เห็นสำหรับ WHERE
+    params = {'id': teacher_id, 'set_photo': 'photo_path' in changes, 'photo_path': changes.get('photo_path'), 'old_photo_path': current_teacher['photo_path']}
+    for col in UPDATE_TEACHER_TEXT_COLUMNS:
+        params[col] = changes.get(col)
+        params[f'old_{col}'] = current_teacher[col]
 
-        with conn.session as s:
-            s.execute(named_query, params=named_params)
-            s.commit()
-    else:
-        # สำหรับ sqlite3 โดยตรง (ใช้ Positional Parameters)
-        cursor = conn.cursor()
-        cursor.execute(query, tuple(params)) # ส่ง List ของพารามิเตอร์เป็น Tuple
-        conn.commit()
-        conn.close()
-    st.cache_data.clear()
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection
+            with conn.session as s:
+                updated_teacher = s.execute(text(UPDATE_TEACHER_QUERY), params).mappings().fetchone()
+                s.commit()
+        else:
+            # สำหรับ sqlite3 โดยตรง
+            updated_teacher = conn.execute(UPDATE_TEACHER_QUERY, params).fetchone()
+            conn.commit()
+
+    if not updated_teacher:
+        # ข้อมูลถูกแก้ไขหรือลบไปแล้วระหว่างที่ผู้ใช้เปิดฟอร์มอยู่: ไม่เขียนทับ และทิ้งรูปใหม่ที่เพิ่งบันทึก
+        new_photo = changes.get('photo_path')
+        if new_photo:
+            _remove_photo_files(new_photo)
+        get_teacher_by_id_from_db.clear(teacher_id)
+        st.error("ข้อมูลครูคนนี้ถูกแก้ไขหรือลบโดยผู้ใช้อื่นระหว่างที่คุณกำลังแก้ไข กรุณาเปิดหน้าแก้ไขใหม่แล้วลองอีกครั้ง")
+        return False
+
+    # ลบรูปภาพเดิมหลังจากฐานข้อมูลชี้ไปยังรูปใหม่ (หรือ NULL) แล้วเท่านั้น
+    if old_photo_to_remove:
+        _remove_photo_files(old_photo_to_remove)
+    _store_refresh_teacher(teacher_id) # อัปเดตที่เก็บรายการครูจากแถวที่ commit แล้ว
+    get_teacher_by_id_from_db.clear(teacher_id)
     st.success(f"ข้อมูลครู ID {teacher_id} อัปเดตสำเร็จ!")
     return True
 
 def delete_teacher_from_db(teacher_id):
     """
     ลบข้อมูลครูและรูปภาพที่เกี่ยวข้องออกจากฐานข้อมูลและโฟลเดอร์.
+    ใช้ DELETE ... RETURNING เพื่อได้ photo_path เดิมกลับมาในคำสั่งเดียว.
     """
-    conn = get_db_connection()
-    teacher_to_delete = get_teacher_by_id_from_db(teacher_id)
+    with borrow_conn() as conn:
+        if hasattr(conn, 'session'):
+            # สำหรับ st.connection
+            with conn.session as s:
+                deleted = s.execute(text('DELETE FROM teachers WHERE id = :id RETURNING photo_path'), dict(id=teacher_id)).fetchone()
+                s.commit()
+        else:
+            # สำหรับ sqlite3 โดยตรง
+            deleted = conn.execute('DELETE FROM teachers WHERE id = ? RETURNING photo_path', (teacher_id,)).fetchone()
+            conn.commit()
 
-    if not teacher_to_delete:
+    if not deleted:
         st.error(f"ไม่พบครู ID {teacher_id} ที่ต้องการลบ")
         return False
 
-    if hasattr(conn, 'session'):
-        # สำหรับ st.connection
-        with conn.session as s:
-            s.execute('DELETE FROM teachers WHERE id = :id', params=dict(id=teacher_id))
-            s.commit()
-    else:
-        # สำหรับ sqlite3 โดยตรง
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM teachers WHERE id = ?', (teacher_id,))
-        conn.commit()
-        conn.close()
-
-    # ลบไฟล์รูปภาพที่เกี่ยวข้อง
-    if teacher_to_delete and teacher_to_delete['photo_path']:
-        photo_full_path = os.path.join(UPLOAD_FOLDER, teacher_to_delete['photo_path'])
-        if os.path.exists(photo_full_path):
-            try:
-                os.remove(photo_full_path)
-                st.info(f"ลบรูปภาพ: {photo_full_path}")
-            except Exception as e:
-                st.warning(f"เกิดข้อผิดพลาดในการลบไฟล์รูปภาพ: {e}")
-    st.cache_data.clear()
+    # ลบไฟล์รูปภาพที่เกี่ยวข้อง (ในเธรดพื้นหลัง)
+    if deleted[0]:
+        _remove_photo_files(deleted[0])
+    _store_refresh_teacher(teacher_id)
+    get_teacher_by_id_from_db.clear(teacher_id)
     st.success(f"ข้อมูลครู ID {teacher_id} ถูกลบสำเร็จ!")
     return True
 
+@st.dialog("ยืนยันการลบ")
+def _confirm_delete_dialog(teacher_id, full_name):
+    """
+    กล่องยืนยันการลบข้อมูลครู. ปุ่มภายในกล่องจะรีรันเฉพาะกล่องนี้
+    และรีรันทั้งหน้าเฉพาะเมื่อยืนยันหรือยกเลิกแล้วเท่านั้น.
+    """
+    st.warning(f"คุณต้องการลบ '{full_name}' ใช่หรือไม่?")
+    confirm_col, cancel_col = st.columns(2)
+    with confirm_col:
+        if st.button("ยืนยันการลบ", key=f"confirm_delete_final_{teacher_id}", type="primary", use_container_width=True):
+            delete_teacher_from_db(teacher_id)
+            st.rerun()
+    with cancel_col:
+        if st.button("ยกเลิก", key=f"cancel_delete_{teacher_id}", use_container_width=True):
+            st.rerun()
+
+def _submit_add_form():
+    """
+    Callback ของปุ่มบันทึกในฟอร์มเพิ่มครู.
+    ทำงานก่อนสคริปต์รีรัน จึงเปลี่ยนไปหน้ารายการได้ในรอบเดียวโดยไม่ต้องเรียก st.rerun().
+    """
+    full_name = st.session_state.add_full_name
+    if not full_name:
+        st.error("ชื่อ-สกุล ต้องไม่ว่างเปล่า!")
+        return
+    add_teacher_to_db(
+        full_name,
+        st.session_state.add_school_affiliation,
+        st.session_state.add_major_subject,
+        st.session_state.add_teaching_subjects,
+        st.session_state.add_contact_number,
+        st.session_state.add_photo_uploader,
+        st.session_state.add_position,
+    )
+    _go_to('list') # กลับไปหน้ารายการหลังจากบันทึก
+
+def _submit_import_csv():
+    """
+    Callback ของปุ่มนำเข้าไฟล์ CSV ในหน้าเพิ่มครู.
+    """
+    csv_file = st.session_state.import_csv_file
+    if csv_file is None:
+        st.error("กรุณาเลือกไฟล์ CSV")
+        return
+    if import_teachers_from_csv(csv_file):
+        _go_to('list')
+
+def _submit_edit_form(current_teacher):
+    """
+    Callback ของปุ่มบันทึกในฟอร์มแก้ไขครู รับข้อมูลครูที่แสดงในฟอร์มเป็นค่าเดิมสำหรับเทียบ.
+    เมื่อบันทึกสำเร็จจะล้างสถานะการแก้ไขและกลับไปหน้ารายการในรอบรีรันเดียวกัน.
+    """
+    if not st.session_state.edit_full_name:
+        st.error("ชื่อ-สกุล ต้องไม่ว่างเปล่า!")
+        return
+    st.session_state.photo_cleared = st.session_state.clear_current_photo
+    photo_to_save = st.session_state.edit_photo_uploader
+    if st.session_state.photo_cleared:
+        photo_to_save = None # ตั้งค่าเป็น None ถ้าเลือกที่จะลบรูปภาพ
+
+    if update_teacher_in_db(
+        current_teacher['id'],
+        st.session_state.edit_full_name,
+        st.session_state.edit_school_affiliation,
+        st.session_state.edit_major_subject,
+        st.session_state.edit_teaching_subjects,
+        st.session_state.edit_contact_number,
+        photo_to_save,
+        st.session_state.edit_position,
+        current_teacher=current_teacher,
+    ):
+        _go_to('list') # กลับไปหน้ารายการหลังจากแก้ไข และล้าง ID ที่กำลังแก้ไข
+        st.session_state.photo_cleared = False # ล้างสถานะการลบรูปภาพ
+
+def _query_param_int(name):
+    """
+    อ่านค่าจำนวนเต็มจาก URL (st.query_params) ส่งคืน None หากไม่มีหรือไม่ใช่ตัวเลข.
+    """
+    try:
+        return int(st.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+def _current_view():
+    """
+    หน้าที่กำลังแสดง อ่านจาก ?view= ใน URL จึงคงอยู่เมื่อรีเฟรชหรือแชร์ลิงก์.
+    """
+    view = st.query_params.get('view', 'list')
+    return view if view in VIEWS else 'list'
+
+def _go_to(view, teacher_id=None):
+    """
+    เปลี่ยนหน้าโดยเขียน view (และ id ของครูที่จะแก้ไข) ลงใน URL. เคอร์เซอร์หน้ารายการ (?before=) คงไว้.
+    """
+    st.query_params['view'] = view
+    if teacher_id is None:
+        st.query_params.pop('id', None)
+    else:
+        st.query_params['id'] = str(teacher_id)
+
+def _set_page_cursor(before_id):
+    """
+    เปลี่ยนหน้ารายการ: เก็บเคอร์เซอร์ (id ที่หน้าต้องน้อยกว่า) ไว้ใน ?before= ของ URL.
+    """
+    if before_id is None:
+        st.query_params.pop('before', None)
+    else:
+        st.query_params['before'] = str(before_id)
+
+def _reset_nav(view):
+    """
+    Callback ของปุ่มนำทาง: ไปยังหน้าที่ระบุและคืนค่า Session เป็นค่าเริ่มต้น.
+    กลับหน้ารายการจะล้างการค้นหาและเริ่มที่หน้าแรกด้วย.
+    """
+    _go_to(view)
+    st.session_state.photo_cleared = SESSION_DEFAULTS['photo_cleared']
+    if view == 'list':
+        _set_page_cursor(None)
+        st.session_state.search_query_school = SESSION_DEFAULTS['search_query_school']
+
+@st.fragment
+def _render_list():
+    """
+    หน้ารายการข้อมูลครู.
+    เป็น fragment: การค้นหาและการเลือกแถวในตารางจะรีรันเฉพาะส่วนนี้ ไม่รีรันส่วนหัวและเมนูทั้งหน้า.
+    """
+    st.header("รายการข้อมูลครู")
+
+    # --- ส่วนค้นหา ---
+    with st.expander("🔎 ค้นหาข้อมูลครู", expanded=False):
+        search_col_input, search_col_button = st.columns([3, 1])
+        with search_col_input:
+            search_term = st.text_input(
+                "ค้นหาสังกัดโรงเรียน:",   
+                value=st.session_state.search_query_school,   
+                key="school_search_input",
+                placeholder="เช่น บ้านด่านเหนือ"
+            )
+        with search_col_button:
+            st.write("") # เว้นวรรคเพื่อให้ปุ่มอยู่ต่ำลงเล็กน้อย
+            if st.button("ค้นหา", key="search_button", use_container_width=True):
+                st.session_state.search_query_school = search_term
+                _set_page_cursor(None) # ผลการค้นหาใหม่เริ่มที่หน้าแรก
+
+    st.markdown("<br>", unsafe_allow_html=True)  # เพิ่มช่องว่าง
+
+    teachers = get_all_teachers_from_db_cached()
+
+    # กรองข้อมูลตามคำค้นหา
+    if st.session_state.search_query_school:
+        search_lower = st.session_state.search_query_school.lower()
+        filtered_teachers = [
+            t for t in teachers   
+            if search_lower in t['_school_lc']
+        ]
+        st.info(f"แสดงผลการค้นหาสำหรับสังกัดโรงเรียน: '{st.session_state.search_query_school}' ({len(filtered_teachers)} รายการ)")
+        teachers_to_display = filtered_teachers
+    else:
+        teachers_to_display = teachers
+
+    # แสดงทีละหน้า: สร้างตาราง/ภาพย่อเฉพาะครูในหน้านี้ ไม่ใช่ทั้งหมด
+    page, prev_before_id, has_prev, has_next, page_number = get_teachers_page(teachers_to_display, _query_param_int('before'))
+    teachers_to_display = page
+
+    if teachers_to_display:
+        # แสดงข้อมูลครูทั้งหมดในตารางเดียว แทนการสร้าง Card ทีละคน
+        teachers_df = pd.DataFrame(teachers_to_display).drop(columns='_school_lc')
+        # เชื่อ photo_path ในฐานข้อมูลโดยไม่ stat ไฟล์: รูปถูกเขียนก่อนบันทึกแถวเสมอ
+        # ถ้าไฟล์หายไปภายหลัง _photo_thumbnail_url คืน None และช่องรูปแสดงว่างแทน
+        teachers_df['photo'] = [
+            _photo_thumbnail_url(os.path.join(UPLOAD_FOLDER, t['photo_path'])) if t['photo_path'] else None
+            for t in teachers_to_display
+        ]
+        table_event = st.dataframe(
+            teachers_df,
+            column_order=['photo', 'id', 'full_name', 'position', 'school_affiliation', 'major_subject', 'teaching_subjects', 'contact_number'],
+            column_config={
+                'photo': st.column_config.ImageColumn("รูป", width="small"),
+                'id': st.column_config.NumberColumn("ID", format="%d", width="small"),
+                'full_name': "ชื่อ-สกุล",
+                'position': "ตำแหน่ง",
+                'school_affiliation': "สังกัดโรงเรียน",
+                'major_subject': "วิชาเอก",
+                'teaching_subjects': "สอนรายวิชา",
+                'contact_number': "เบอร์ติดต่อ",
+            },
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            # key ผูกกับชุด ID ที่แสดง: เมื่อแถวถูกเพิ่ม/ลบ/กรอง การเลือกเดิมจะถูกล้าง ไม่ชี้ไปผิดคน
+            key=f"teacher_table_{hash(tuple(teachers_df['id']))}",
+        )
+
+        col_prev, col_page, col_next = st.columns([1, 4, 1])
+        with col_prev:
+            st.button("◀ ก่อนหน้า", key="prev_page", on_click=_set_page_cursor, args=(prev_before_id,), disabled=not has_prev, use_container_width=True)
+        with col_page:
+            st.caption(f"หน้า {page_number}")
+        with col_next:
+            st.button("ถัดไป ▶", key="next_page", on_click=_set_page_cursor, args=(teachers_to_display[-1]['id'],), disabled=not has_next, use_container_width=True)
+
+        selected_rows = table_event.selection.rows
+        if not selected_rows:
+            st.caption("เลือกแถวในตารางเพื่อแก้ไขหรือลบข้อมูลครู")
+        else:
+            teacher = teachers_to_display[selected_rows[0]]
+            st.markdown(f"**ครูที่เลือก:** {teacher['full_name']} (ID: {teacher['id']})")
+            col_edit, col_delete, _ = st.columns([1, 1, 4])
+            with col_edit:
+                edit_button = st.button("✏️ แก้ไข", key=f"edit_teacher_{teacher['id']}", help="แก้ไขข้อมูล", use_container_width=True)
+            with col_delete:
+                delete_button = st.button("🗑️ ลบ", key=f"delete_teacher_{teacher['id']}", help="ลบข้อมูล", use_container_width=True)
+
+            if edit_button:
+                _go_to('edit', teacher['id'])
+                st.rerun()
+
+            if delete_button:
+                _confirm_delete_dialog(teacher['id'], teacher['full_name'])
+
+    else:
+        st.info("ไม่พบข้อมูลครูในระบบ หรือไม่พบผลการค้นหา")
+
+def _render_add():
+    """
+    หน้าเพิ่มข้อมูลครูใหม่.
+    """
+    st.header("เพิ่มข้อมูลครูใหม่")
+    with st.form("add_teacher_form", clear_on_submit=True):
+        st.text_input("ชื่อ-สกุล:", key="add_full_name")
+        st.text_input("ตำแหน่ง:", key="add_position", placeholder="เช่น ครูผู้ช่วย, ครูชำนาญการ")
+        st.text_input("สังกัดโรงเรียน:", key="add_school_affiliation")
+        st.text_input("วิชาเอก:", key="add_major_subject")
+        st.text_input("สอนรายวิชา (คั่นด้วยคอมม่า):", key="add_teaching_subjects")
+        st.text_input("เบอร์ติดต่อ:", key="add_contact_number")
+        st.file_uploader("รูปถ่ายใบหน้า:", type=["png", "jpg", "jpeg"], key="add_photo_uploader")
+
+        # บันทึกผ่าน on_click เพื่อให้ state เปลี่ยนก่อนรีรัน ไม่ต้องเรียก st.rerun() ซ้ำอีกรอบ
+        st.form_submit_button("💾 บันทึกข้อมูลครู", type="primary", on_click=_submit_add_form)
+
+    with st.expander("📄 นำเข้าข้อมูลครูจากไฟล์ CSV"):
+        st.caption(f"หัวคอลัมน์: {', '.join(IMPORT_CSV_COLUMNS)} (ต้องมี full_name)")
+        st.file_uploader("ไฟล์ CSV:", type=["csv"], key="import_csv_file")
+        st.button("📥 นำเข้าข้อมูล", key="import_csv", on_click=_submit_import_csv)
+
+def _render_edit():
+    """
+    หน้าแก้ไขข้อมูลครูตาม ?id= ใน URL.
+    """
+    teacher_id_to_edit = _query_param_int('id')
+    if teacher_id_to_edit:
+        teacher_data = get_teacher_by_id_from_db(teacher_id_to_edit)
+        if teacher_data:
+            st.header(f"แก้ไขข้อมูลครู: {teacher_data['full_name']}")
+            with st.form("edit_teacher_form"):
+                # แสดงข้อมูลปัจจุบันในช่องกรอก
+                st.text_input("ชื่อ-สกุล:", value=teacher_data['full_name'] or "", key="edit_full_name")
+                st.text_input("ตำแหน่ง:", value=teacher_data.get('position', '') or "", key="edit_position")
+                st.text_input("สังกัดโรงเรียน:", value=teacher_data['school_affiliation'] or "", key="edit_school_affiliation")
+                st.text_input("วิชาเอก:", value=teacher_data['major_subject'] or "", key="edit_major_subject")
+                st.text_input("สอนรายวิชา (คั่นด้วยคอมม่า):", value=teacher_data['teaching_subjects'] or "", key="edit_teaching_subjects")
+                st.text_input("เบอร์ติดต่อ:", value=teacher_data['contact_number'] or "", key="edit_contact_number")
+
+                # แสดงรูปภาพปัจจุบัน (ถ้ามี)
+                if teacher_data['photo_path']:
+                    photo_path_full = os.path.join(UPLOAD_FOLDER, teacher_data['photo_path'])
+                    # ใช้ภาพย่อที่ cache ไว้แล้ว (ขนาดเท่ากับที่แสดง) แทนการอ่านรูปเต็มทุกครั้งที่รีรัน
+                    # ไม่ตรวจไฟล์ก่อน: มีรูปก็แสดง ไม่มีก็เตือน (EAFP)
+                    try:
+                        st.image(_photo_thumbnail(photo_path_full), caption="รูปภาพปัจจุบัน", width=150)
+                    except OSError:
+                        st.warning("ไม่พบไฟล์รูปภาพปัจจุบันในโฟลเดอร์")
+                else:
+                    st.info("ยังไม่มีรูปภาพสำหรับครูคนนี้")
+
+                # อัปโหลดรูปภาพใหม่
+                st.file_uploader("เปลี่ยนรูปถ่ายใบหน้า (เลือกไฟล์ใหม่):", type=["png", "jpg", "jpeg"], key="edit_photo_uploader")
+
+                # Checkbox สำหรับลบรูปภาพปัจจุบัน
+                st.checkbox("ลบรูปภาพปัจจุบัน", value=st.session_state.get('photo_cleared', False), key="clear_current_photo")
+
+                st.form_submit_button("📝 บันทึกการแก้ไข", type="primary", on_click=_submit_edit_form, args=(teacher_data,))
+        else:
+            st.error("ไม่พบข้อมูลครูที่ต้องการแก้ไข")
+            _go_to('list')
+            st.rerun()
+
+# ฟังก์ชันแสดงผลของแต่ละหน้า เลือกเรียกเฉพาะหน้าที่กำลังแสดงอยู่
+VIEWS = {
+    'list': _render_list,
+    'add': _render_add,
+    'edit': _render_edit,
+}
+
+@st.cache_data(show_spinner=False)
+def _read_logo(path):
+    """
+    อ่านไฟล์โลโก้ครั้งเดียวต่อโปรเซส แล้วส่ง bytes ให้ st.image โดยตรง
+    (ไม่ต้อง stat และถอดรหัส PNG ด้วย PIL ทุกครั้งที่รีรัน). ส่งคืน None หากไม่มีไฟล์.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
 # --- Streamlit App UI ---
 
 # กำหนดการตั้งค่าหน้าเว็บ
@@ -402,7 +1131,8 @@ st.set_page_config(
 )
 
 # เพิ่ม CSS สำหรับสไตล์ Minimal และธีมสีฟ้าพาสเทล
-st.markdown("""
+# ใช้ st.html ส่ง <style> ไปตรงๆ ไม่ต้องผ่านตัวแปลง Markdown ทุกครั้งที่รีรัน
+st.html("""
 <style>
     /* ซ่อนเมนูเบอร์เกอร์และปุ่ม Deploy */
     #MainMenu {visibility: hidden;}
@@ -482,71 +1212,22 @@ st.markdown("""
         margin-bottom: 20px;
     }
 
-    /* ปุ่มแก้ไขและลบขนาดเล็กทางขวา */
-    .small-button {
-        padding: 4px 8px !important; /* ลดขนาด padding */
-        font-size: 12px !important; /* ลดขนาด font */
-        border-radius: 5px !important;
-        margin-left: 5px; /* ระยะห่างระหว่างปุ่ม */
-        display: inline-flex; /* ให้อยู่ในบรรทัดเดียวกัน */
-        align-items: center;
-        justify-content: center;
-        height: 30px; /* กำหนดความสูงเพื่อให้ปุ่มเท่ากัน */
-    }
-    .small-button.edit-btn {
-        background-color: #FFC107; /* Amber - สำหรับแก้ไข */
-        color: white;
-        border: none;
-    }
-    .small-button.edit-btn:hover {
-        background-color: #FFA000; /* Darker Amber */
-    }
-    .small-button.delete-btn {
-        background-color: #F44336; /* Red - สำหรับลบ */
-        color: white;
-        border: none;
-    }
-    .small-button.delete-btn:hover {
-        background-color: #D32F2F; /* Darker Red */
-    }
-    .small-button.confirm-delete-btn { /* ปุ่มยืนยันการลบ */
-        background-color: #E53935; /* Red 600 */
-        color: white;
-        border: none;
-    }
-    .small-button.confirm-delete-btn:hover {
-        background-color: #C62828; /* Red 800 */
-    }
-    .small-button.cancel-btn { /* ปุ่มยกเลิกการลบ */
-        background-color: #B0BEC5; /* Blue Grey 200 */
-        color: #424242;
-        border: none;
-    }
-    .small-button.cancel-btn:hover {
-        background-color: #90A4AE; /* Blue Grey 300 */
-    }
-
     /* จัดปุ่มใน Card ให้อยู่ชิดขวา */
     .stExpander > div > div > div > div {
         text-align: right;
     }
 
 </style>
-""", unsafe_allow_html=True)
+""")
 
 
 # กำหนดสถานะเริ่มต้นของ Session
-if 'current_view' not in st.session_state:
-    st.session_state.current_view = 'list'
-if 'edit_teacher_id' not in st.session_state:
-    st.session_state.edit_teacher_id = None
-if 'photo_cleared' not in st.session_state:
-    st.session_state.photo_cleared = False
-if 'search_query_school' not in st.session_state:
-    st.session_state.search_query_school = ""
-
-# ตั้งค่าฐานข้อมูล (สร้างตาราง/โฟลเดอร์ หากยังไม่มี)
-setup_database()
+# หน้าที่แสดง ครูที่กำลังแก้ไข และหน้าของรายการ อยู่ใน URL (?view=, ?id=, ?before=) ไม่ใช่ใน Session
+for key, value in SESSION_DEFAULTS.items():
+    st.session_state.setdefault(key, value)
+
+# ตั้งค่าฐานข้อมูล (สร้างตาราง/โฟลเดอร์ หากยังไม่มี) ครั้งเดียวต่อโปรเซส
+_setup_once()
 
 # --- ส่วนหัว: ชื่อระบบและโลโก้ ---
 header_container = st.container()
@@ -556,12 +1237,9 @@ with header_container:
         st.markdown("## 👨‍🏫 **ระบบจัดการฐานข้อมูลครูกลุ่มโรงเรียนบ้านด่าน 2**", unsafe_allow_html=True)
     with col_logo:
         logo_path = "ban_dan_2_logo.png"  # ตรวจสอบให้แน่ใจว่าไฟล์โลโก้อยู่ในที่ถูกต้อง
-        if os.path.exists(logo_path):
-            try:
-                logo = Image.open(logo_path)
-                st.image(logo, width=100)  # ปรับขนาดตามต้องการ
-            except Exception as e:
-                st.error(f"เกิดข้อผิดพลาดในการโหลดโลโก้: {e}")
+        logo = _read_logo(logo_path)
+        if logo is not None:
+            st.image(logo, width=100)  # ปรับขนาดตามต้องการ
         else:
             st.warning(f"ไม่พบไฟล์โลโก้ที่: {logo_path}")
 
@@ -573,18 +1251,9 @@ with nav_container:
     # แบ่งคอลัมน์สำหรับปุ่มนำทางและการส่งออก
     col1, col2, col3, _ = st.columns([1,1,1,3])  
     with col1:
-        if st.button("📚 แสดงข้อมูลครูทั้งหมด", key="show_all", use_container_width=True):
-            st.session_state.current_view = 'list'
-            st.session_state.edit_teacher_id = None
-            st.session_state.photo_cleared = False
-            st.session_state.search_query_school = "" # ล้างการค้นหาเมื่อกลับไปหน้ารายการ
-            st.rerun() # รีรันเพื่ออัปเดต UI
+        st.button("📚 แสดงข้อมูลครูทั้งหมด", key="show_all", use_container_width=True, on_click=_reset_nav, args=('list',))
     with col2:
-        if st.button("➕ เพิ่มข้อมูลครูใหม่", key="add_new", use_container_width=True):
-            st.session_state.current_view = 'add'
-            st.session_state.edit_teacher_id = None
-            st.session_state.photo_cleared = False
-            st.rerun()
+        st.button("➕ เพิ่มข้อมูลครูใหม่", key="add_new", use_container_width=True, on_click=_reset_nav, args=('add',))
     with col3:
         # ปุ่มดาวน์โหลดไฟล์ Excel
         excel_file_data = export_teachers_to_excel()
@@ -602,205 +1271,4 @@ st.markdown("---")  # เส้นแบ่ง
 # --- Content Area ---
 content_container = st.container()
 with content_container:
-    if st.session_state.current_view == 'list':
-        st.header("รายการข้อมูลครู")
-
-        # --- ส่วนค้นหา ---
-        with st.expander("🔎 ค้นหาข้อมูลครู", expanded=False):
-            search_col_input, search_col_button = st.columns([3, 1])
-            with search_col_input:
-                search_term = st.text_input(
-                    "ค้นหาสังกัดโรงเรียน:",   
-                    value=st.session_state.search_query_school,   
-                    key="school_search_input",
-                    placeholder="เช่น บ้านด่านเหนือ"
-                )
-            with search_col_button:
-                st.write("") # เว้นวรรคเพื่อให้ปุ่มอยู่ต่ำลงเล็กน้อย
-                if st.button("ค้นหา", key="search_button", use_container_width=True):
-                    st.session_state.search_query_school = search_term
-        
-        st.markdown("<br>", unsafe_allow_html=True)  # เพิ่มช่องว่าง
-
-        teachers = get_all_teachers_from_db_cached()
-        
-        # กรองข้อมูลตามคำค้นหา
-        if st.session_state.search_query_school:
-            search_lower = st.session_state.search_query_school.lower()
-            filtered_teachers = [
-                t for t in teachers   
-                if t['school_affiliation'] and search_lower in t['school_affiliation'].lower()
-            ]
-            st.info(f"แสดงผลการค้นหาสำหรับสังกัดโรงเรียน: '{st.session_state.search_query_school}' ({len(filtered_teachers)} รายการ)")
-            teachers_to_display = filtered_teachers
-        else:
-            teachers_to_display = teachers
-
-        if teachers_to_display:
-            # วนลูปแสดงข้อมูลครูแต่ละคนในรูปแบบ Card
-            for teacher in teachers_to_display:   
-                teacher_card = st.container(border=True)  # สร้าง Card พร้อมเส้นขอบ
-                with teacher_card:
-                    col_info, col_photo, col_buttons = st.columns([4, 1.5, 1]) # แบ่ง 3 คอลัมน์ภายใน Card
-                    
-                    with col_info:
-                        st.markdown(f"### {teacher['full_name']} (ID: {teacher['id']})")
-                        st.markdown(f"**ตำแหน่ง:** {teacher.get('position', '-') or '-'}")
-                        st.markdown(f"**สังกัดโรงเรียน:** {teacher['school_affiliation'] or '-'}")
-                        st.markdown(f"**วิชาเอก:** {teacher['major_subject'] or '-'}")
-                        st.markdown(f"**สอนรายวิชา:** {teacher['teaching_subjects'] or '-'}")
-                        st.markdown(f"**เบอร์ติดต่อ:** {teacher['contact_number'] or '-'}")
-                    
-                    with col_photo:
-                        if teacher['photo_path']:
-                            photo_path_full = os.path.join(UPLOAD_FOLDER, teacher['photo_path'])
-                            if os.path.exists(photo_path_full):
-                                st.image(photo_path_full, caption=f"รูป {teacher['full_name']}", width=120) # ลดขนาดรูป
-                            else:
-                                st.warning("ไม่พบไฟล์รูปภาพ")
-                        else:
-                            st.info("ไม่มีรูปภาพ")
-                    
-                    with col_buttons:
-                        st.markdown("<div style='text-align: right; margin-top: 20px;'>", unsafe_allow_html=True) # จัดปุ่มไปทางขวาและเพิ่มระยะห่าง
-                        edit_button = st.button(f"✏️", key=f"edit_teacher_{teacher['id']}", help="แก้ไขข้อมูล", args=[teacher['id']], use_container_width=False)
-                        delete_button = st.button(f"🗑️", key=f"delete_teacher_{teacher['id']}", help="ลบข้อมูล", args=[teacher['id']], use_container_width=False)
-                        st.markdown("</div>", unsafe_allow_html=True)
-
-                        # ใช้ CSS class สำหรับปุ่มขนาดเล็ก
-                        st.markdown(f"""
-                            <style>
-                                #st-b-edit_teacher_{teacher['id']} > button {{
-                                    {'.small-button.edit-btn' if edit_button else '.small-button.edit-btn'}
-                                }}
-                                #st-b-delete_teacher_{teacher['id']} > button {{
-                                    {'.small-button.delete-btn' if delete_button else '.small-button.delete-btn'}
-                                }}
-                            </style>
-                        """, unsafe_allow_html=True)
-                        
-                        if edit_button:
-                            st.session_state.current_view = 'edit'
-                            st.session_state.edit_teacher_id = teacher['id']
-                            st.rerun() 
-                        
-                        if delete_button:
-                            st.session_state[f'show_confirm_delete_{teacher["id"]}'] = True
-                            st.rerun() 
-
-                        # กลไกยืนยันการลบสองชั้น
-                        if st.session_state.get(f'show_confirm_delete_{teacher["id"]}', False):
-                            st.markdown("<br>", unsafe_allow_html=True) # เพิ่มช่องว่าง
-                            st.warning(f"คุณต้องการลบ '{teacher['full_name']}' ใช่หรือไม่?")
-                            confirm_col1, confirm_col2 = st.columns([1,1])
-                            with confirm_col1:
-                                confirm_del_btn = st.button("ยืนยันการลบ", key=f"confirm_delete_final_{teacher['id']}", type="primary", use_container_width=True)
-                                st.markdown(f"""
-                                    <style>
-                                        #st-b-confirm_delete_final_{teacher['id']} > button {{
-                                            .small-button.confirm-delete-btn
-                                        }}
-                                    </style>
-                                """, unsafe_allow_html=True)
-                            with confirm_col2:
-                                cancel_del_btn = st.button("ยกเลิก", key=f"cancel_delete_{teacher['id']}", use_container_width=True)
-                                st.markdown(f"""
-                                    <style>
-                                        #st-b-cancel_delete_{teacher['id']} > button {{
-                                            .small-button.cancel-btn
-                                        }}
-                                    </style>
-                                """, unsafe_allow_html=True)
-
-                            if confirm_del_btn:
-                                if delete_teacher_from_db(teacher['id']):
-                                    st.session_state.current_view = 'list'
-                                del st.session_state[f'show_confirm_delete_{teacher["id"]}'] 
-                                st.rerun()
-                            if cancel_del_btn:
-                                del st.session_state[f'show_confirm_delete_{teacher["id"]}']
-                                st.rerun()
-                st.markdown("---") # เส้นแบ่งเล็กๆ ระหว่าง card
-
-        else:
-            st.info("ไม่พบข้อมูลครูในระบบ หรือไม่พบผลการค้นหา")
-
-    elif st.session_state.current_view == 'add':
-        st.header("เพิ่มข้อมูลครูใหม่")
-        with st.form("add_teacher_form", clear_on_submit=True):
-            full_name = st.text_input("ชื่อ-สกุล:", key="add_full_name")
-            position = st.text_input("ตำแหน่ง:", key="add_position", placeholder="เช่น ครูผู้ช่วย, ครูชำนาญการ")
-            school_affiliation = st.text_input("สังกัดโรงเรียน:", key="add_school_affiliation")
-            major_subject = st.text_input("วิชาเอก:", key="add_major_subject")
-            teaching_subjects = st.text_input("สอนรายวิชา (คั่นด้วยคอมม่า):", key="add_teaching_subjects")
-            contact_number = st.text_input("เบอร์ติดต่อ:", key="add_contact_number")
-            photo_file = st.file_uploader("รูปถ่ายใบหน้า:", type=["png", "jpg", "jpeg"], key="add_photo_uploader")
-
-            submitted = st.form_submit_button("💾 บันทึกข้อมูลครู", type="primary")
-            if submitted:
-                if full_name:
-                    add_teacher_to_db(full_name, school_affiliation, major_subject, teaching_subjects, contact_number, photo_file, position)
-                    st.session_state.current_view = 'list' # กลับไปหน้ารายการหลังจากบันทึก
-                    st.rerun()
-                else:
-                    st.error("ชื่อ-สกุล ต้องไม่ว่างเปล่า!")
-
-    elif st.session_state.current_view == 'edit':
-        teacher_id_to_edit = st.session_state.edit_teacher_id
-        if teacher_id_to_edit:
-            teacher_data = get_teacher_by_id_from_db(teacher_id_to_edit)
-            if teacher_data:
-                st.header(f"แก้ไขข้อมูลครู: {teacher_data['full_name']}")
-                with st.form("edit_teacher_form"):
-                    # แสดงข้อมูลปัจจุบันในช่องกรอก
-                    new_full_name = st.text_input("ชื่อ-สกุล:", value=teacher_data['full_name'] or "", key="edit_full_name")
-                    new_position = st.text_input("ตำแหน่ง:", value=teacher_data.get('position', '') or "", key="edit_position")
-                    new_school_affiliation = st.text_input("สังกัดโรงเรียน:", value=teacher_data['school_affiliation'] or "", key="edit_school_affiliation")
-                    new_major_subject = st.text_input("วิชาเอก:", value=teacher_data['major_subject'] or "", key="edit_major_subject")
-                    new_teaching_subjects = st.text_input("สอนรายวิชา (คั่นด้วยคอมม่า):", value=teacher_data['teaching_subjects'] or "", key="edit_teaching_subjects")
-                    new_contact_number = st.text_input("เบอร์ติดต่อ:", value=teacher_data['contact_number'] or "", key="edit_contact_number")
-
-                    # แสดงรูปภาพปัจจุบัน (ถ้ามี)
-                    if teacher_data['photo_path']:
-                        photo_path_full = os.path.join(UPLOAD_FOLDER, teacher_data['photo_path'])
-                        if os.path.exists(photo_path_full):
-                            st.image(photo_path_full, caption="รูปภาพปัจจุบัน", width=150)
-                        else:
-                            st.warning("ไม่พบไฟล์รูปภาพปัจจุบันในโฟลเดอร์")
-                    else:
-                        st.info("ยังไม่มีรูปภาพสำหรับครูคนนี้")
-
-                    # อัปโหลดรูปภาพใหม่
-                    new_photo_file = st.file_uploader("เปลี่ยนรูปถ่ายใบหน้า (เลือกไฟล์ใหม่):", type=["png", "jpg", "jpeg"], key="edit_photo_uploader")
-                    
-                    # Checkbox สำหรับลบรูปภาพปัจจุบัน
-                    clear_photo = st.checkbox("ลบรูปภาพปัจจุบัน", value=st.session_state.get('photo_cleared', False), key="clear_current_photo")
-                    st.session_state.photo_cleared = clear_photo
-
-                    submitted = st.form_submit_button("📝 บันทึกการแก้ไข", type="primary")
-                    if submitted:
-                        if not new_full_name:
-                            st.error("ชื่อ-สกุล ต้องไม่ว่างเปล่า!")
-                        else:
-                            photo_to_save = new_photo_file
-                            if st.session_state.photo_cleared:
-                                photo_to_save = None # ตั้งค่าเป็น None ถ้าเลือกที่จะลบรูปภาพ
-
-                            if update_teacher_in_db(
-                                teacher_id_to_edit,
-                                new_full_name,
-                                new_school_affiliation,
-                                new_major_subject,
-                                new_teaching_subjects,
-                                new_contact_number,
-                                photo_to_save,
-                                new_position 
-                            ):
-                                st.session_state.current_view = 'list' # กลับไปหน้ารายการหลังจากแก้ไข
-                                st.session_state.edit_teacher_id = None # ล้าง ID ที่กำลังแก้ไข
-                                st.session_state.photo_cleared = False # ล้างสถานะการลบรูปภาพ
-                                st.rerun()
-            else:
-                st.error("ไม่พบข้อมูลครูที่ต้องการแก้ไข")
-                st.session_state.current_view = 'list'
-                st.rerun()
+    VIEWS[_current_view()]()